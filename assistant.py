@@ -1,16 +1,13 @@
+import asyncio
 from pathlib import Path
-from robocorp import workitems
-from robocorp.tasks import get_output_dir, task
-import shutil
+from robocorp.tasks import task
 import os
-from git import Repo
-from git.exc import GitCommandError
-import json
 import time
+import re
+from functools import lru_cache
 import subprocess
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import sys
-from types import SimpleNamespace
 
 try:
     # Assistant is optional at runtime; import guarded to avoid breaking existing tasks if dependency missing.
@@ -29,12 +26,42 @@ from scripts.tools import (
     get_org_name,
     repos,
 )
+from scripts.json_io import dumps, read_json, write_bytes_atomic, write_json_atomic
 
 HEADLESS_FLAGS = {"1", "true", "yes", "on"}
-
-
+# Minimum seconds between dialog repaints for streamed rcc output
+OUTPUT_REFRESH_INTERVAL = 0.5
+SHARD_FILE_PATTERN = re.compile(r"work-items-shard-(\d+)\.json")
+
+PRODUCER_INPUT_PATH = Path("devdata/work-items-in/input-for-producer/work-items.json")
+PRODUCER_ENV = {
+    "RC_WORKITEM_ADAPTER": "FileAdapter",
+    "RC_WORKITEM_INPUT_PATH": str(PRODUCER_INPUT_PATH),
+    "RC_WORKITEM_OUTPUT_PATH": "output/producer-to-consumer/work-items.json",
+}
+CONSUMER_ENV = {
+    "RC_WORKITEM_ADAPTER": "FileAdapter",
+    "RC_WORKITEM_INPUT_PATH": "output/producer-to-consumer/work-items.json",
+    "RC_WORKITEM_OUTPUT_PATH": "output/consumer-to-reporter/work-items.json",
+}
+REPORTER_ENV = {
+    "RC_WORKITEM_ADAPTER": "FileAdapter",
+    "RC_WORKITEM_INPUT_PATH": "output/consumer-to-reporter/work-items.json",
+    "RC_WORKITEM_OUTPUT_PATH": "output/reporter-final/work-items.json",
+}
+# The stage env files never vary between runs, so serialize them once. These
+# are byte for byte the tracked devdata files, so an unchanged file is not
+# rewritten and the checkout stays clean.
+PRODUCER_ENV_JSON = dumps(PRODUCER_ENV, indent=True) + b"\n"
+REPORTER_ENV_JSON = dumps(REPORTER_ENV, indent=True) + b"\n"
+
+
+@lru_cache(maxsize=1)
 def is_headless_environment() -> bool:
-    """Detect whether the assistant should skip launching a UI."""
+    """Detect whether the assistant should skip launching a UI.
+
+    Computed once per process; the variables it reads do not change mid-run.
+    """
 
     forced = os.environ.get("ASSISTANT_HEADLESS") or os.environ.get(
         "RC_ASSISTANT_HEADLESS"
@@ -53,6 +80,89 @@ def is_headless_environment() -> bool:
     return False
 
 
+def write_env(path: Path, content: bytes) -> None:
+    """Write an rcc env file, skipping the write when it is already up to date."""
+
+    try:
+        if path.stat().st_size == len(content) and path.read_bytes() == content:
+            return
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A run started while another is still reading the file never sees half of it
+    write_bytes_atomic(path, content)
+
+
+def discover_shard_files(shards_dir: Path) -> List[Tuple[int, Path]]:
+    """List shard files with their shard numbers from a single directory scan."""
+
+    shard_files: List[Tuple[int, Path]] = []
+    try:
+        with os.scandir(shards_dir) as entries:
+            for entry in entries:
+                match = SHARD_FILE_PATTERN.fullmatch(entry.name)
+                if match and entry.is_file():
+                    shard_files.append((int(match.group(1)), Path(entry.path)))
+    except FileNotFoundError:
+        return []
+
+    # Order numerically so shard 10 follows shard 9 rather than shard 1
+    shard_files.sort()
+    return shard_files
+
+
+def shard_artifacts_dir(shard_idx: int) -> Path:
+    """Private artifacts directory (ROBOT_ARTIFACTS) of one Consumer shard run.
+
+    Shards run side by side, so each needs its own log.html and
+    output.robolog instead of overwriting the ones in output/.
+    """
+    return Path("output") / f"consumer-shard-{shard_idx}"
+
+
+def collect_shard_artifacts(shard_idx: int) -> None:
+    """Move a finished shard's log, zip and report to where CI runs leave them.
+
+    The log goes to consumer-to-reporter/consumer-shard-<id>-logs.html, the
+    name the dashboard picks shard logs up by; the shard zip and report go
+    to output/ next to the other stage outputs.
+    """
+    artifacts_dir = shard_artifacts_dir(shard_idx)
+    moves = (
+        ("log.html", Path("output/consumer-to-reporter") / f"consumer-shard-{shard_idx}-logs.html"),
+        (f"repos-shard-{shard_idx}.zip", Path("output") / f"repos-shard-{shard_idx}.zip"),
+        (f"report-shard-{shard_idx}.json", Path("output") / f"report-shard-{shard_idx}.json"),
+    )
+    for name, target in moves:
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(artifacts_dir / name, target)
+        except FileNotFoundError:
+            # A shard without successful clones has no zip; only a missing log is odd
+            if name == "log.html":
+                print(f"[assistant] Consumer shard {shard_idx} left no {name}")
+        except OSError as exc:
+            print(f"[assistant] Could not move {name} of shard {shard_idx}: {exc}")
+
+
+def find_latest_final_report(output_dir: Path) -> Optional[Path]:
+    """Return the newest final_report_*.json without sorting the directory."""
+
+    latest: Optional[str] = None
+    try:
+        with os.scandir(output_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                # Names embed a %Y%m%d-%H%M%S timestamp, so the largest is the newest
+                if name.startswith("final_report_") and name.endswith(".json"):
+                    if latest is None or name > latest:
+                        latest = name
+    except FileNotFoundError:
+        return None
+
+    return output_dir / latest if latest else None
+
+
 @task
 def assistant_org():
     """Interactive pipeline launcher using RPA.Assistant.
@@ -74,7 +184,15 @@ def assistant_org():
         "Reporter": ["Consumer"],
         "Dashboard": ["Reporter"],
     }
+    # Dependencies as bitmasks over stage_order indices, computed once
+    stage_bits = {stage: 1 << idx for idx, stage in enumerate(stage_order)}
+    dependency_masks = {
+        stage: sum(stage_bits[dep] for dep in stage_dependencies.get(stage, []))
+        for stage in stage_order
+    }
     last_form_data = {"org": "", "max_workers": "1"}
+    # Snapshot of the last progress view drawn, used to skip redundant repaints
+    last_render_key: Optional[Tuple[object, ...]] = None
 
     def render_progress(
         completed: int,
@@ -84,16 +202,48 @@ def assistant_org():
         max_workers_display: str,
         running_stage: Optional[str] = None,
         final: bool = False,
+        stage_output: Optional[str] = None,
     ) -> None:
-        assistant.clear_dialog()
-        assistant.add_heading("Producer-Consumer-Pipeline", size="large")
-        assistant.add_text(f"Organization: {org_name}")
-        assistant.add_text(f"Max Workers: {max_workers_display}")
+        nonlocal last_render_key
 
         progress_value = 0.0
         if stage_order:
             progress_value = min(max(completed / len(stage_order), 0.0), 1.0)
 
+        stage_lines: List[str] = []
+        for stage in stage_order:
+            status = stage_status.get(stage)
+            message = stage_messages.get(stage, "")
+
+            if status is None:
+                stage_lines.append(f"⏳ {stage}: Pending")
+            elif status == "skipped":
+                stage_lines.append(f"⏭️ {stage}: {message or 'Skipped'}")
+            elif status is True:
+                stage_lines.append(f"✅ {stage}: {message or 'Success'}")
+            else:
+                stage_lines.append(f"❌ {stage}: {message or 'Failed'}")
+
+        # The Assistant only supports clear + rebuild, so avoid doing it
+        # when nothing visible has changed since the last paint.
+        render_key = (
+            org_name,
+            max_workers_display,
+            progress_value,
+            running_stage,
+            stage_output,
+            tuple(stage_lines),
+            final,
+        )
+        if render_key == last_render_key:
+            return
+        last_render_key = render_key
+
+        assistant.clear_dialog()
+        assistant.add_heading("Producer-Consumer-Pipeline", size="large")
+        assistant.add_text(f"Organization: {org_name}")
+        assistant.add_text(f"Max Workers: {max_workers_display}")
+
         assistant.add_loading_bar(
             "progress",
             value=progress_value,
@@ -104,20 +254,12 @@ def assistant_org():
 
         if running_stage:
             assistant.add_text(f"⏳ Running {running_stage}…", size="medium")
+            if stage_output:
+                assistant.add_text(stage_output, size="small")
 
         assistant.add_text("")
-        for stage in stage_order:
-            status = stage_status.get(stage)
-            message = stage_messages.get(stage, "")
-
-            if status is None:
-                assistant.add_text(f"⏳ {stage}: Pending")
-            elif status == "skipped":
-                assistant.add_text(f"⏭️ {stage}: {message or 'Skipped'}")
-            elif status is True:
-                assistant.add_text(f"✅ {stage}: {message or 'Success'}")
-            else:
-                assistant.add_text(f"❌ {stage}: {message or 'Failed'}")
+        for line in stage_lines:
+            assistant.add_text(line)
 
         if final:
             assistant.add_text("")
@@ -127,9 +269,48 @@ def assistant_org():
 
         assistant.refresh_dialog()
 
-    def run_rcc_task(command: List[str]) -> Tuple[bool, str]:
+    def stage_output_handler(
+        completed: int,
+        stage_status: Dict[str, object],
+        stage_messages: Dict[str, str],
+        org_name: str,
+        max_workers_display: str,
+        stage: str,
+    ) -> Callable[[str], None]:
+        """Build an rcc output callback that shows the latest line under the running stage."""
+        last_paint = 0.0
+
+        def on_output(line: str) -> None:
+            nonlocal last_paint
+            now = time.monotonic()
+            # Repaints rebuild the whole dialog, so cap them instead of one per line
+            if not line.strip() or now - last_paint < OUTPUT_REFRESH_INTERVAL:
+                return
+            last_paint = now
+            render_progress(
+                completed,
+                stage_status,
+                stage_messages,
+                org_name,
+                max_workers_display,
+                running_stage=stage,
+                stage_output=line.strip()[:160],
+            )
+
+        return on_output
+
+    async def run_rcc_task(
+        command: List[str],
+        env: Optional[Dict[str, str]] = None,
+        on_output: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[bool, str]:
         """Run an rcc task with a configurable timeout.
 
+        The subprocess is awaited instead of polled, so several independent
+        rcc invocations (e.g. Consumer shards) can run concurrently. With
+        ``on_output`` the combined stdout/stderr is piped, echoed to the
+        console and passed to the callback line by line.
+
         Environment variables to tune behavior:
         - ASSISTANT_STAGE_TIMEOUT: seconds (float/int) per stage. Default 900 (15m).
         - ASSISTANT_PRODUCER_TIMEOUT / ASSISTANT_CONSUMER_TIMEOUT / ASSISTANT_REPORTER_TIMEOUT / ASSISTANT_DASHBOARD_TIMEOUT
@@ -161,33 +342,17 @@ def assistant_org():
         print(f"[assistant] Running: {' '.join(command)} (timeout={timeout_seconds}s stage={stage_name})")
         start_time = time.time()
         try:
-            # Use Popen for streaming output; inherit stdout/stderr.
-            proc = subprocess.Popen(command, stdout=None, stderr=None, text=True)
-            while True:
-                ret = proc.poll()
-                if ret is not None:
-                    success = ret == 0
-                    elapsed = time.time() - start_time
-                    return success, ("Success" if success else f"Exit code {ret} after {elapsed:.1f}s")
-                elapsed = time.time() - start_time
-                if elapsed > timeout_seconds:
-                    print(f"[assistant] Stage {stage_name or command} exceeded timeout ({timeout_seconds}s). Sending SIGTERM...")
-                    try:
-                        proc.terminate()
-                    except Exception:
-                        pass
-                    # Wait grace period
-                    try:
-                        proc.wait(timeout=grace_period)
-                    except subprocess.TimeoutExpired:
-                        print(f"[assistant] Process did not exit in grace period ({grace_period}s). Sending SIGKILL...")
-                        try:
-                            proc.kill()
-                        except Exception:
-                            pass
-                    final_ret = proc.poll()
-                    return False, f"Timeout after {elapsed:.1f}s (limit {timeout_seconds}s)"
-                time.sleep(0.5)
+            if on_output is None:
+                # Inherit stdout/stderr so rcc output keeps streaming to the console.
+                proc = await asyncio.create_subprocess_exec(*command, env=env)
+            else:
+                proc = await asyncio.create_subprocess_exec(
+                    *command,
+                    env=env,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT,
+                    limit=1 << 20,
+                )
         except FileNotFoundError:
             return (
                 False,
@@ -196,6 +361,75 @@ def assistant_org():
         except Exception as exc:  # pragma: no cover - defensive
             return False, str(exc)
 
+        async def pump_and_wait() -> int:
+            if proc.stdout is not None:
+                async for raw_line in proc.stdout:
+                    line = raw_line.decode(errors="replace").rstrip("\r\n")
+                    print(line, flush=True)
+                    on_output(line)
+            return await proc.wait()
+
+        async def stop_process() -> None:
+            try:
+                proc.terminate()
+            except ProcessLookupError:
+                pass
+            # Wait grace period
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=grace_period)
+            except asyncio.TimeoutError:
+                print(f"[assistant] Process did not exit in grace period ({grace_period}s). Sending SIGKILL...")
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    pass
+                await proc.wait()
+
+        try:
+            ret = await asyncio.wait_for(pump_and_wait(), timeout=timeout_seconds)
+        except asyncio.TimeoutError:
+            elapsed = time.time() - start_time
+            print(f"[assistant] Stage {stage_name or command} exceeded timeout ({timeout_seconds}s). Sending SIGTERM...")
+            await stop_process()
+            return False, f"Timeout after {elapsed:.1f}s (limit {timeout_seconds}s)"
+        except (ValueError, asyncio.LimitOverrunError) as exc:
+            # A single output line longer than the pipe's 1 MiB line limit
+            elapsed = time.time() - start_time
+            print(f"[assistant] Stage {stage_name or command} output could not be read ({exc}). Sending SIGTERM...")
+            await stop_process()
+            return False, f"Output line over 1 MiB after {elapsed:.1f}s: {exc}"
+
+        success = ret == 0
+        elapsed = time.time() - start_time
+        return success, ("Success" if success else f"Exit code {ret} after {elapsed:.1f}s")
+
+    async def run_consumer_shards(
+        shard_commands: List[Tuple[int, List[str]]],
+        base_env: Dict[str, str],
+        on_output: Optional[Callable[[str], None]] = None,
+    ) -> List[Tuple[bool, str]]:
+        """Run all Consumer shards concurrently, each with its own SHARD_ID and artifacts dir."""
+
+        def shard_output(shard_idx: int) -> Optional[Callable[[str], None]]:
+            if on_output is None:
+                return None
+            return lambda line: on_output(f"[shard {shard_idx}] {line}")
+
+        return await asyncio.gather(
+            *(
+                run_rcc_task(
+                    command,
+                    env={
+                        **base_env,
+                        "SHARD_ID": str(shard_idx),
+                        "ROBOT_ARTIFACTS": str(shard_artifacts_dir(shard_idx).resolve()),
+                    },
+                    on_output=shard_output(shard_idx),
+                )
+                for shard_idx, command in shard_commands
+            )
+        )
+
     def run_pipeline(form_result) -> None:
         nonlocal last_form_data
 
@@ -218,54 +452,40 @@ def assistant_org():
             f"Starting pipeline for organization: {org_name} (max workers: {max_workers_display})"
         )
 
-        # Prepare environment and input artifacts
-        os.environ["ORG_NAME"] = org_name
-        os.environ["SHARD_ID"] = "0"
-        os.environ["MAX_WORKERS"] = max_workers_display
-
-        work_items_dir = Path("devdata/work-items-in/input-for-producer")
-        work_items_dir.mkdir(parents=True, exist_ok=True)
-        work_items_path = work_items_dir / "work-items.json"
-        with open(work_items_path, "w") as handle:
-            json.dump([{"payload": {"org": org_name}}], handle, indent=4)
-
-        producer_env = {
-            "RC_WORKITEM_ADAPTER": "FileAdapter",
-            "RC_WORKITEM_INPUT_PATH": str(work_items_path),
-            "RC_WORKITEM_OUTPUT_PATH": "output/producer-to-consumer/work-items.json",
-        }
-        consumer_env = {
-            "RC_WORKITEM_ADAPTER": "FileAdapter",
-            "RC_WORKITEM_INPUT_PATH": "output/producer-to-consumer/work-items.json",
-            "RC_WORKITEM_OUTPUT_PATH": "output/consumer-to-reporter/work-items.json",
-        }
-        reporter_env = {
-            "RC_WORKITEM_ADAPTER": "FileAdapter",
-            "RC_WORKITEM_INPUT_PATH": "output/consumer-to-reporter/work-items.json",
-            "RC_WORKITEM_OUTPUT_PATH": "output/reporter-final/work-items.json",
+        # Prepare environment and input artifacts. The pipeline settings go to
+        # the child processes only, so the assistant's own environment stays
+        # the same from one run to the next.
+        pipeline_env = {
+            **os.environ,
+            "ORG_NAME": org_name,
+            "SHARD_ID": "0",
+            "MAX_WORKERS": max_workers_display,
         }
 
+        PRODUCER_INPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(
+            PRODUCER_INPUT_PATH, [{"payload": {"org": org_name}}], indent=True
+        )
+
         stage_status: Dict[str, object] = {stage: None for stage in stage_order}
         stage_messages: Dict[str, str] = {}
 
         Path("devdata").mkdir(exist_ok=True)
         Path("output/reporter-final").mkdir(parents=True, exist_ok=True)
 
-        def write_env(path: Path, data: dict) -> None:
-            path.parent.mkdir(parents=True, exist_ok=True)
-            with open(path, "w") as env_handle:
-                json.dump(data, env_handle, indent=4)
-
         render_progress(0, stage_status, stage_messages, org_name, max_workers_display)
 
         # Keep merged consumer items for summary display (list of dict payloads)
         consumer_merged_payloads: List[dict] = []
 
+        # Bit i is set once stage_order[i] has succeeded
+        success_mask = 0
+
         for index, stage in enumerate(stage_order):
-            dependencies = stage_dependencies.get(stage, [])
-            if any(stage_status.get(dep) is not True for dep in dependencies):
+            missing_mask = dependency_masks[stage] & ~success_mask
+            if missing_mask:
                 missing = ", ".join(
-                    dep for dep in dependencies if stage_status.get(dep) is not True
+                    dep for dep in stage_order if stage_bits[dep] & missing_mask
                 )
                 stage_status[stage] = "skipped"
                 stage_messages[stage] = f"Skipped because {missing} did not succeed."
@@ -287,12 +507,19 @@ def assistant_org():
                 running_stage=stage,
             )
             print(f"Running {stage} ({index + 1}/{len(stage_order)})…")
+            on_output = stage_output_handler(
+                index, stage_status, stage_messages, org_name, max_workers_display, stage
+            )
 
             if stage == "Producer":
                 env_path = Path("devdata/env-for-producer.json")
-                write_env(env_path, producer_env)
-                success, message = run_rcc_task(
-                    ["rcc", "run", "-t", "Producer", "-e", str(env_path)]
+                write_env(env_path, PRODUCER_ENV_JSON)
+                success, message = asyncio.run(
+                    run_rcc_task(
+                        ["rcc", "run", "-t", "Producer", "-e", str(env_path)],
+                        env=pipeline_env,
+                        on_output=on_output,
+                    )
                 )
             elif stage == "Consumer":
                 # 1. Generate shards based on MAX_WORKERS
@@ -306,7 +533,7 @@ def assistant_org():
                         f"[assistant] Generating shards with command: {' '.join(shard_gen_cmd)}"
                     )
                     shard_proc = subprocess.run(
-                        shard_gen_cmd, capture_output=True, text=True
+                        shard_gen_cmd, capture_output=True, text=True, env=pipeline_env
                     )
                     if shard_proc.returncode != 0:
                         print(shard_proc.stdout)
@@ -330,39 +557,52 @@ def assistant_org():
 
                 # 2. Discover shards
                 shards_dir = Path("output/shards")
-                shard_files = sorted(shards_dir.glob("work-items-shard-*.json"))
+                shard_files = discover_shard_files(shards_dir)
                 if not shard_files:
                     print("[assistant] No shard files found; nothing to consume.")
                     success = True
                     message = "No shards"
                 else:
                     all_outputs: List[str] = []
-                    shard_success = True
-                    for shard_idx, shard_file in enumerate(shard_files):
-                        shard_env = consumer_env.copy()
+                    shard_commands: List[Tuple[int, List[str]]] = []
+                    for shard_idx, shard_file in shard_files:
+                        shard_env = CONSUMER_ENV.copy()
                         shard_env["RC_WORKITEM_INPUT_PATH"] = str(shard_file)
                         shard_env["RC_WORKITEM_OUTPUT_PATH"] = (
                             f"output/consumer-to-reporter/work-items-shard-{shard_idx}.json"
                         )
-                        os.environ["SHARD_ID"] = str(shard_idx)
+                        # Logs, zip and report of each shard stay apart until collected
+                        shard_env["ROBOT_ARTIFACTS"] = str(
+                            shard_artifacts_dir(shard_idx).resolve()
+                        )
                         env_path = Path(
                             f"devdata/env-for-consumer-shard-{shard_idx}.json"
                         )
-                        write_env(env_path, shard_env)
+                        write_env(env_path, dumps(shard_env, indent=True))
                         print(
-                            f"[assistant] Running Consumer shard {shard_idx} with {shard_file.name}"
+                            f"[assistant] Queued Consumer shard {shard_idx} with {shard_file.name}"
                         )
-                        shard_ok, shard_msg = run_rcc_task(
-                            ["rcc", "run", "-t", "Consumer", "-e", str(env_path)]
+                        shard_commands.append(
+                            (shard_idx, ["rcc", "run", "-t", "Consumer", "-e", str(env_path)])
                         )
+                        all_outputs.append(
+                            f"output/consumer-to-reporter/work-items-shard-{shard_idx}.json"
+                        )
+
+                    # Shards are independent, so run them side by side and keep
+                    # going on failure to gather as many results as possible.
+                    shard_results = asyncio.run(
+                        run_consumer_shards(shard_commands, pipeline_env, on_output)
+                    )
+                    shard_success = True
+                    for (shard_idx, _), (shard_ok, shard_msg) in zip(
+                        shard_commands, shard_results
+                    ):
                         print(
                             f"[assistant] Consumer shard {shard_idx} result: {shard_ok} {shard_msg}"
                         )
                         shard_success = shard_success and shard_ok
-                        all_outputs.append(
-                            f"output/consumer-to-reporter/work-items-shard-{shard_idx}.json"
-                        )
-                        # Early abort if one shard fails? Keep going to gather more results.
+                        collect_shard_artifacts(shard_idx)
 
                     # 3. Merge shard outputs into consolidated file for Reporter stage
                     consolidated_path = Path(
@@ -373,19 +613,18 @@ def assistant_org():
                         p = Path(output_fp)
                         if p.exists():
                             try:
-                                with open(p, "r") as f:
-                                    data = json.load(f)
-                                    if isinstance(data, list):
-                                        # Items could be list of objects with 'payload' or raw dicts
-                                        for entry in data:
-                                            if isinstance(entry, dict):
-                                                payload = entry.get("payload") if "payload" in entry else entry
-                                                if isinstance(payload, dict):
-                                                    merged_items.append(payload)
-                                    else:
-                                        print(
-                                            f"[assistant] Skipping non-list output file {p}"
-                                        )
+                                data = read_json(p)
+                                if isinstance(data, list):
+                                    # Items could be list of objects with 'payload' or raw dicts
+                                    for entry in data:
+                                        if isinstance(entry, dict):
+                                            payload = entry.get("payload") if "payload" in entry else entry
+                                            if isinstance(payload, dict):
+                                                merged_items.append(payload)
+                                else:
+                                    print(
+                                        f"[assistant] Skipping non-list output file {p}"
+                                    )
                             except Exception as merge_exc:
                                 print(
                                     f"[assistant] Error reading shard output {p}: {merge_exc}"
@@ -396,8 +635,7 @@ def assistant_org():
                             )
                     try:
                         consolidated_path.parent.mkdir(parents=True, exist_ok=True)
-                        with open(consolidated_path, "w") as f:
-                            json.dump(merged_items, f, indent=2)
+                        write_json_atomic(consolidated_path, merged_items)
                         print(
                             f"[assistant] Merged {len(merged_items)} items into {consolidated_path}"
                         )
@@ -414,17 +652,27 @@ def assistant_org():
                     )
             elif stage == "Reporter":
                 env_path = Path("devdata/env-for-reporter.json")
-                write_env(env_path, reporter_env)
-                success, message = run_rcc_task(
-                    ["rcc", "run", "-t", "Reporter", "-e", str(env_path)]
+                write_env(env_path, REPORTER_ENV_JSON)
+                success, message = asyncio.run(
+                    run_rcc_task(
+                        ["rcc", "run", "-t", "Reporter", "-e", str(env_path)],
+                        env=pipeline_env,
+                        on_output=on_output,
+                    )
                 )
             else:  # Dashboard
-                success, message = run_rcc_task(
-                    ["rcc", "run", "-t", "GenerateConsolidatedDashboard"]
+                success, message = asyncio.run(
+                    run_rcc_task(
+                        ["rcc", "run", "-t", "GenerateConsolidatedDashboard"],
+                        env=pipeline_env,
+                        on_output=on_output,
+                    )
                 )
 
             stage_status[stage] = success
             stage_messages[stage] = message
+            if success:
+                success_mask |= stage_bits[stage]
 
             render_progress(
                 index + 1, stage_status, stage_messages, org_name, max_workers_display
@@ -445,19 +693,15 @@ def assistant_org():
                 repos_payloads = consumer_merged_payloads
             else:
                 # Try reporter summary file
-                reporter_dir = Path("output")
-                final_reports = sorted(
-                    reporter_dir.glob("final_report_*.json"), reverse=True
-                )
-                if final_reports:
+                latest_report = find_latest_final_report(Path("output"))
+                if latest_report:
                     try:
-                        with open(final_reports[0], "r") as f:
-                            data = json.load(f)
-                            summary = data.get("summary", {})
-                            repo_entries = summary.get("repositories", [])
-                            for entry in repo_entries:
-                                if isinstance(entry, dict):
-                                    repos_payloads.append(entry)
+                        data = read_json(latest_report)
+                        summary = data.get("summary", {})
+                        repo_entries = summary.get("repositories", [])
+                        for entry in repo_entries:
+                            if isinstance(entry, dict):
+                                repos_payloads.append(entry)
                     except Exception as exc:  # pragma: no cover - defensive
                         print(
                             f"[assistant] Could not parse reporter final report: {exc}"
@@ -469,18 +713,17 @@ def assistant_org():
                     )
                     if cons_file.exists():
                         try:
-                            with open(cons_file, "r") as f:
-                                data = json.load(f)
-                                if isinstance(data, list):
-                                    for entry in data:
-                                        if isinstance(entry, dict):
-                                            payload = (
-                                                entry.get("payload")
-                                                if "payload" in entry
-                                                else entry
-                                            )
-                                            if isinstance(payload, dict):
-                                                repos_payloads.append(payload)
+                            data = read_json(cons_file)
+                            if isinstance(data, list):
+                                for entry in data:
+                                    if isinstance(entry, dict):
+                                        payload = (
+                                            entry.get("payload")
+                                            if "payload" in entry
+                                            else entry
+                                        )
+                                        if isinstance(payload, dict):
+                                            repos_payloads.append(payload)
                         except Exception as exc:
                             print(
                                 f"[assistant] Failed reading consumer consolidated file: {exc}"
@@ -594,6 +837,9 @@ def assistant_org():
     def reset_form(
         error_message: Optional[str] = None, *, refresh: bool = True
     ) -> None:
+        nonlocal last_render_key
+        # The form replaces the progress view, so the next run must repaint.
+        last_render_key = None
         assistant.clear_dialog()
         assistant.add_heading("Fetch Repos Bot Pipeline", size="large")
         assistant.add_text(
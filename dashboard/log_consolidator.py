@@ -15,6 +15,7 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 import html
+from collections import Counter
 from bs4 import BeautifulSoup
 import pandas as pd
 from robocorp import log
@@ -690,20 +691,16 @@ class LogConsolidator:
             'execution_timespan': {}
         }
         
-        # Log level distribution
-        for log_entry in self.consolidated_data['task_logs']:
-            level = log_entry['log_level']
-            summary['log_level_counts'][level] = summary['log_level_counts'].get(level, 0) + 1
-        
-        # Task status distribution
-        for execution in self.consolidated_data['task_executions']:
-            status = execution['status']
-            summary['task_status_counts'][status] = summary['task_status_counts'].get(status, 0) + 1
-        
-        # Work item status distribution
-        for work_item in self.consolidated_data['work_items']:
-            status = work_item['status']
-            summary['work_item_status_counts'][status] = summary['work_item_status_counts'].get(status, 0) + 1
+        # Status/level distributions, in first-seen order
+        summary['log_level_counts'] = dict(Counter(
+            entry['log_level'] for entry in self.consolidated_data['task_logs']
+        ))
+        summary['task_status_counts'] = dict(Counter(
+            execution['status'] for execution in self.consolidated_data['task_executions']
+        ))
+        summary['work_item_status_counts'] = dict(Counter(
+            work_item['status'] for work_item in self.consolidated_data['work_items']
+        ))
         
         # Execution timespan
         timestamps = [entry['timestamp'] for entry in self.consolidated_data['task_logs'] if entry['timestamp']]
@@ -720,8 +717,10 @@ class LogConsolidator:
         """Export consolidated data to JSON for dashboard consumption."""
         consolidated_result = self.consolidate_all_logs()
         
+        # Serialize first so the file is written in one call rather than per chunk
+        content = json.dumps(consolidated_result, indent=2, default=str)
         with open(output_path, 'w') as f:
-            json.dump(consolidated_result, f, indent=2, default=str)
+            f.write(content)
         
         log.info(f"Consolidated data exported to {output_path}")
         return output_path
@@ -1,11 +1,85 @@
 import os
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
 from pandas import DataFrame
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from scripts.json_io import read_json, write_json_atomic
 
 # Timeout for HTTP requests (in seconds)
 REQUEST_TIMEOUT = 10
 
+# Number of pages fetched concurrently once the total page count is known
+PAGE_FETCH_WORKERS = 8
+
+# Columns of the repository DataFrame, in the order rows are built
+REPO_COLUMNS = (
+    "Name",
+    "Description",
+    "Language",
+    "Stars",
+    "URL",
+    "Created",
+    "Last Updated",
+    "Is Fork",
+    "Private",
+    "Size",
+)
+
+# GitHub API fields for each of REPO_COLUMNS, in the same order.
+# clone_url is used for the URL column because it is what git operations need.
+REPO_FIELD_KEYS = (
+    "name",
+    "description",
+    "language",
+    "stargazers_count",
+    "clone_url",
+    "created_at",
+    "updated_at",
+    "fork",
+    "private",
+    "size",
+)
+get_repo_fields = itemgetter(*REPO_FIELD_KEYS)
+PRIVATE_FIELD = REPO_FIELD_KEYS.index("private")
+
+# ETag cache keys requested by this process; only these are written back, so
+# pages and orgs that are no longer fetched drop out of the cache
+_requested_cache_keys = set()
+
+class RepoFetchError(RuntimeError):
+    """Some page of an entity's repository list could not be fetched."""
+
+def create_session() -> requests.Session:
+    """
+    Create a pooled HTTP session that retries transient GitHub API failures.
+
+    Returns:
+        requests.Session: Session sized for the concurrent page fetches
+    """
+    session = requests.Session()
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(
+        pool_connections=PAGE_FETCH_WORKERS,
+        pool_maxsize=PAGE_FETCH_WORKERS,
+        max_retries=retry,
+    )
+    session.mount("https://", adapter)
+    return session
+
+# Shared across calls so TCP/TLS connections are reused between pages and orgs
+SESSION = create_session()
+
 def get_repo_root() -> Path:
     """
     Find the root directory of the repository by looking for robot.yaml.
@@ -20,6 +94,103 @@ def get_repo_root() -> Path:
     # Fallback to current file's parent directory
     return Path(__file__).parent.parent
 
+def get_last_page(response: requests.Response, page: int) -> Optional[int]:
+    """
+    Read the last page number from a GitHub API response's Link header.
+
+    Args:
+        response (requests.Response): Response for a page of results
+        page (int): The page number that was requested
+
+    Returns:
+        Optional[int]: The last page number (``page`` itself when there is no
+        ``rel="next"`` link), or None when more pages exist but GitHub did not
+        say how many
+    """
+    links = response.links
+    if "next" not in links:
+        return page
+    last_url = links.get("last", {}).get("url")
+    if not last_url:
+        return None
+    try:
+        return int(parse_qs(urlparse(last_url).query)["page"][0])
+    except (KeyError, IndexError, ValueError):
+        return None
+
+def get_etag_cache_path() -> Path:
+    """
+    Location of the cache of GitHub ETags and repository rows used for conditional requests.
+
+    Returns:
+        Path: Path to the ETag cache file under devdata/
+    """
+    return get_repo_root() / "devdata" / "etag-cache.json"
+
+def load_etag_cache() -> dict:
+    """
+    Load the ETag cache, returning an empty cache if it is missing or unreadable.
+
+    Returns:
+        dict: Mapping of request key to {"etag", "last_page", "repos"}, where
+        repos holds one list of REPO_FIELD_KEYS values per repository
+    """
+    cache_path = get_etag_cache_path()
+    if not cache_path.exists():
+        return {}
+    try:
+        cache = read_json(cache_path)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable ETag cache '{cache_path}': {e}")
+        return {}
+    if not isinstance(cache, dict):
+        return {}
+    # Entries missing a field or holding whole API bodies (written by older
+    # versions) are dropped, so they are simply refetched
+    return {
+        key: entry
+        for key, entry in cache.items()
+        if isinstance(entry, dict)
+        and {"etag", "last_page", "repos"} <= entry.keys()
+        and isinstance(entry["repos"], list)
+        and all(
+            isinstance(row, list) and len(row) == len(REPO_FIELD_KEYS)
+            for row in entry["repos"]
+        )
+    }
+
+def get_repo_rows(repos: list) -> list:
+    """
+    Project GitHub API repository objects onto REPO_FIELD_KEYS.
+
+    Args:
+        repos (list): Repository objects from one page of results
+
+    Returns:
+        list: One list of REPO_FIELD_KEYS values per repository
+    """
+    try:
+        return [list(get_repo_fields(repo)) for repo in repos]
+    except KeyError:
+        # Some field is missing from this page; fall back to tolerant lookups
+        return [[repo.get(key) for key in REPO_FIELD_KEYS] for repo in repos]
+
+def save_etag_cache(cache: dict) -> None:
+    """
+    Persist the ETag cache, warning instead of failing when it cannot be written.
+
+    Args:
+        cache (dict): Mapping of request key to {"etag", "last_page", "repos"},
+            as returned by load_etag_cache
+    """
+    cache_path = get_etag_cache_path()
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Atomic, so a run killed mid-write leaves the previous cache intact
+        write_json_atomic(cache_path, cache)
+    except OSError as e:
+        print(f"Failed to write ETag cache '{cache_path}': {e}")
+
 def fetch_github_repos(entity: str, entity_type: str = None, write_csv: bool = False) -> DataFrame:
     """
     Fetch repositories from a GitHub organization or user.
@@ -36,6 +207,9 @@ def fetch_github_repos(entity: str, entity_type: str = None, write_csv: bool = F
 
     Returns:
         pandas.DataFrame: DataFrame containing repository information
+
+    Raises:
+        RepoFetchError: If the entity type or any page of the listing could not be fetched
     """
     # Read token from environment (support both common names)
     token = os.getenv("GITHUB_TOKEN") or os.getenv("GH_TOKEN")
@@ -44,10 +218,15 @@ def fetch_github_repos(entity: str, entity_type: str = None, write_csv: bool = F
         # Try to determine if it's an org or user
         test_url = f"https://api.github.com/orgs/{entity}"
         try:
-            test_response = requests.get(test_url, timeout=REQUEST_TIMEOUT)
-        except requests.exceptions.Timeout:
-            print("Request timed out while determining entity type.")
-            return DataFrame()
+            test_response = SESSION.get(test_url, timeout=REQUEST_TIMEOUT)
+        except requests.exceptions.Timeout as e:
+            raise RepoFetchError(
+                f"Request timed out while determining the entity type of '{entity}'"
+            ) from e
+        except requests.RequestException as e:
+            raise RepoFetchError(
+                f"Could not determine the entity type of '{entity}': {e}"
+            ) from e
         entity_type = "org" if test_response.status_code == 200 else "user"
     
     # Set the appropriate API endpoint
@@ -63,66 +242,117 @@ def fetch_github_repos(entity: str, entity_type: str = None, write_csv: bool = F
         # Use token for authenticated requests (allows higher rate limits and access to private repos)
         headers["Authorization"] = f"token {token}"
     repo_list = []
-    page = 1
+    etag_cache = load_etag_cache()
+    loaded_cache = dict(etag_cache)
 
-    while True:
+    def fetch_page(page: int):
+        """Fetch a single page of repositories, returning (repos, last_page) or None on failure."""
         params = {
             "per_page": per_page,
             "page": page,
             "sort": "updated",
             "direction": "desc"
         }
+        # Authenticated and anonymous results differ, so cache them separately
+        cache_key = f"{'token' if token else 'anonymous'}:{url}?page={page}&per_page={per_page}"
+        _requested_cache_keys.add(cache_key)
+        cached = etag_cache.get(cache_key)
+        request_headers = headers
+        if cached:
+            request_headers = {**headers, "If-None-Match": cached["etag"]}
         try:
-            response = requests.get(url, headers=headers, params=params, timeout=REQUEST_TIMEOUT)
+            response = SESSION.get(url, headers=request_headers, params=params, timeout=REQUEST_TIMEOUT)
         except requests.exceptions.Timeout:
             print(f"Request timed out while fetching page {page}.")
-            break
-        
+            return None
+        except requests.RequestException as e:
+            # Includes the RetryError raised once the session's 5xx retries run out
+            print(f"Failed to fetch repositories on page {page}: {e}")
+            return None
+
+        # Unchanged since the last run: reuse the cached page body
+        if response.status_code == 304 and cached:
+            return cached["repos"], cached["last_page"]
+
         # Handle rate limiting
         if response.status_code == 403 and "rate limit exceeded" in response.text.lower():
             print("Rate limit exceeded. Please try again later.")
-            break
-            
+            return None
+
         if response.status_code != 200:
             print(f"Failed to fetch repositories on page {page}: {response.status_code}")
-            break
-
-        repos = response.json()
-        if not repos:  # No more repos to fetch
-            break
-
-        for repo in repos:
-            # If the repo is private and we don't have a token, skip it.
-            if repo.get("private", False) and not token:
-                continue
-
-            repo_list.append({
-                "Name": repo.get("name"),
-                "Description": repo.get("description"),
-                "Language": repo.get("language"),
-                "Stars": repo.get("stargazers_count"),
-                "URL": repo.get("clone_url"),  # Use clone_url for git operations
-                "Created": repo.get("created_at"),
-                "Last Updated": repo.get("updated_at"),
-                "Is Fork": repo.get("fork", False),
-                "Private": repo.get("private", False)
-            })
+            return None
+
+        repos = get_repo_rows(response.json())
+        last_page = get_last_page(response, page)
+        etag = response.headers.get("ETag")
+        if etag:
+            etag_cache[cache_key] = {"etag": etag, "last_page": last_page, "repos": repos}
+        else:
+            etag_cache.pop(cache_key, None)
+        return repos, last_page
+
+    # A page that still fails after the session's retries fails the whole
+    # fetch: a partial list would silently leave repositories out of the run
+    failed_pages = []
+
+    # The first page tells us how many pages exist via the Link header
+    first_page = fetch_page(1)
+    if first_page is None:
+        pages = []
+        failed_pages.append(1)
+    else:
+        first_repos, last_page = first_page
+        pages = [first_repos]
+        if last_page is None:
+            # No page count advertised: follow rel="next" one page at a time
+            page = 1
+            while last_page is None or last_page > page:
+                page += 1
+                result = fetch_page(page)
+                if result is None:
+                    failed_pages.append(page)
+                    break
+                repos, last_page = result
+                pages.append(repos)
+        elif last_page > 1:
+            # Remaining pages are independent, so fetch them concurrently
+            with ThreadPoolExecutor(max_workers=PAGE_FETCH_WORKERS) as executor:
+                results = executor.map(fetch_page, range(2, last_page + 1))
+                for page, result in enumerate(results, start=2):
+                    if result is None:
+                        failed_pages.append(page)
+                    else:
+                        pages.append(result[0])
+    # Pages that did arrive are still worth their ETags on the next run. The
+    # file is only rewritten when a page changed or an entry dropped out.
+    etag_cache = {
+        key: entry for key, entry in etag_cache.items() if key in _requested_cache_keys
+    }
+    if etag_cache != loaded_cache:
+        save_etag_cache(etag_cache)
+    if failed_pages:
+        raise RepoFetchError(
+            f"Could not fetch page(s) {', '.join(map(str, failed_pages))} of the repositories for '{entity}'"
+        )
+
+    for page, repos in enumerate(pages, start=1):
+        # If the repo is private and we don't have a token, skip it.
+        repo_list.extend(repos if token else [repo for repo in repos if not repo[PRIVATE_FIELD]])
 
         print(f"Fetched page {page} with {len(repos)} repositories. Total fetched so far: {len(repo_list)}")
-        
-        # If we got fewer repos than per_page, we've reached the end
-        if len(repos) < per_page:
-            break
-        page += 1
 
     print("\nRepository statistics:")
     print(f"Total public repositories found: {len(repo_list)}")
     
-    # Sort by stars for the CSV
-    repo_list.sort(key=lambda x: x["Stars"] or 0, reverse=True)
-    
-    # Create DataFrame
-    df = DataFrame(repo_list)
+    # Create DataFrame from the rows in one pass
+    df = DataFrame.from_records(repo_list, columns=REPO_COLUMNS)
+
+    # Sort by stars for the CSV (done by pandas rather than a Python key function)
+    if not df.empty:
+        df = df.sort_values(
+            "Stars", ascending=False, na_position="last", kind="stable", ignore_index=True
+        )
     
     if write_csv:
         base_dir = get_repo_root()
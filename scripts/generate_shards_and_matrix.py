@@ -1,33 +1,98 @@
-import json
-import math
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
 
+# Allow running as a plain script (python3 scripts/generate_shards_and_matrix.py)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.json_io import read_json, write_json_atomic
+
+# Upper bound on concurrent shard writers
+SHARD_WRITE_WORKERS = 8
+
+# Fixed cost of one clone (connection, negotiation, process start) expressed
+# in KB of repository size, so many tiny repositories still weigh something
+CLONE_OVERHEAD_KB = 1024
+
+# "cost" balances estimated clone cost across shards; "count" keeps the
+# producer's order and only balances item counts
+SHARD_BALANCE = os.getenv("SHARD_BALANCE", "cost")
+SHARD_BALANCE_MODES = ("cost", "count")
+
+def clone_cost(work_item):
+    """Estimated cost of cloning a work item's repository, from GitHub's size in KB."""
+    payload = work_item.get('payload') or {}
+    try:
+        size = max(int(payload.get('Size') or 0), 0)
+    except (TypeError, ValueError):
+        size = 0
+    return size + CLONE_OVERHEAD_KB
+
+def split_evenly(work_items, num_shards):
+    """Split work items into num_shards contiguous lists whose sizes differ by at most one."""
+    per_shard, extra = divmod(len(work_items), num_shards)
+    shards = []
+    start = 0
+    for i in range(num_shards):
+        end = start + per_shard + (1 if i < extra else 0)
+        shards.append(work_items[start:end])
+        start = end
+    return shards
+
+def partition(work_items, num_shards):
+    """Split work items into num_shards lists of roughly equal total clone cost.
+
+    Longest-processing-time first: the most expensive remaining item always
+    goes to the currently lightest shard, so one large repository no longer
+    lands on a shard that is also full of others.
+    """
+    shards = [[] for _ in range(num_shards)]
+    loads = [(0, i) for i in range(num_shards)]
+    for cost, _, work_item in sorted(
+        ((clone_cost(w), n, w) for n, w in enumerate(work_items)),
+        key=lambda entry: (-entry[0], entry[1]),
+    ):
+        load, i = loads[0]
+        shards[i].append(work_item)
+        heapq.heapreplace(loads, (load + cost, i))
+    return shards
+
 def main(max_workers):
+    # A mistyped mode must not quietly fall back to another partitioning
+    if SHARD_BALANCE not in SHARD_BALANCE_MODES:
+        print(
+            f"Error: unknown SHARD_BALANCE '{SHARD_BALANCE}', "
+            f"expected one of: {', '.join(SHARD_BALANCE_MODES)}"
+        )
+        sys.exit(1)
+
     # Read work items from producer output
     work_items_path = Path('output/producer-to-consumer/work-items.json')
     if not work_items_path.exists():
         print(f"Warning: {work_items_path} not found, treating as empty work items.")
         work_items = []
     else:
-        with open(work_items_path, 'r') as f:
-            work_items = json.load(f)
+        work_items = read_json(work_items_path)
     max_workers = int(max_workers)
     total = len(work_items)
 
     if total == 0:
         print("No work items to process, creating empty matrix.")
         matrix_config = {'matrix': {'include': []}}
-        with open('output/matrix-output.json', 'w') as f:
-            json.dump(matrix_config, f)
+        write_json_atomic('output/matrix-output.json', matrix_config)
         print("Generated empty matrix.")
         return
 
-    # Adjust number of workers based on item count
+    # Adjust number of workers based on item count; with at least as many
+    # items as shards, every shard gets one
     num_workers = min(max_workers, total)
-    per_shard = math.ceil(total / num_workers)
+    if SHARD_BALANCE == 'count':
+        shards = split_evenly(work_items, num_workers)
+    else:
+        shards = partition(work_items, num_workers)
 
-    # Create shards using computed start indices to avoid empty shards
     shards_dir = Path('output/shards')
     if shards_dir.exists():
         for file in shards_dir.iterdir():
@@ -35,20 +100,22 @@ def main(max_workers):
                 file.unlink()
     shards_dir.mkdir(exist_ok=True)
 
-    shard_starts = list(range(0, total, per_shard))
-    for i, start_idx in enumerate(shard_starts):
-        shard_items = work_items[start_idx:start_idx + per_shard]
+    def write_shard(i, shard_items):
         shard_file = shards_dir / f'work-items-shard-{i}.json'
-        with open(shard_file, 'w') as f:
-            json.dump(shard_items, f)
-        print(f'Created shard {i} with {len(shard_items)} items')
+        write_json_atomic(shard_file, shard_items)
+        return len(shard_items)
+
+    # Shards are independent files, so write them concurrently
+    with ThreadPoolExecutor(max_workers=min(len(shards), SHARD_WRITE_WORKERS)) as pool:
+        shard_sizes = list(pool.map(write_shard, range(len(shards)), shards))
+    for i, shard_size in enumerate(shard_sizes):
+        print(f'Created shard {i} with {shard_size} items')
 
     # Build matrix include after shards are created
-    matrix_include = [{'shard_id': i} for i in range(len(shard_starts))]
+    matrix_include = [{'shard_id': i} for i in range(len(shards))]
     # Save matrix config
     matrix_config = {'matrix': {'include': matrix_include}}
-    with open('output/matrix-output.json', 'w') as f:
-        json.dump(matrix_config, f)
+    write_json_atomic('output/matrix-output.json', matrix_config)
     print(f'Generated matrix with {len(matrix_include)} shards')
 
 if __name__ == "__main__":
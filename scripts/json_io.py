@@ -0,0 +1,76 @@
+"""JSON helpers that use orjson when it is available.
+
+orjson is part of the robot environment (conda.yaml), but some scripts are
+also launched with a bare ``python3`` in CI, so the standard library is used
+as a fallback there.
+"""
+import json
+import mmap
+import os
+import threading
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - defensive
+    orjson = None  # type: ignore
+
+
+def dumps(obj, indent: bool = False) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes, optionally indented by two spaces."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode("utf-8")
+
+
+def loads(data):
+    """Deserialize JSON from bytes or str."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def read_json(path):
+    """Read and parse a JSON file in one call.
+
+    With orjson the file is memory-mapped and parsed in place, so large
+    producer outputs are not first copied into a bytes object.
+    """
+    with open(path, "rb") as f:
+        if orjson is None or os.fstat(f.fileno()).st_size == 0:
+            return loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
+
+def write_json(path, obj, indent: bool = False) -> None:
+    """Serialize obj and write it to path in one call."""
+    with open(Path(path), "wb") as f:
+        f.write(dumps(obj, indent=indent))
+
+
+def write_json_atomic(path, obj, indent: bool = False) -> None:
+    """Serialize obj and write it with write_bytes_atomic."""
+    write_bytes_atomic(path, dumps(obj, indent=indent))
+
+
+def write_bytes_atomic(path, data: bytes) -> None:
+    """Write data to a temp file next to path, then rename it into place.
+
+    Readers see either the previous file or the complete new one, never a
+    partial write, and a failed write leaves no stray temp file behind.
+    """
+    path = Path(path)
+    # Unique per process and thread, created exclusively with the usual umask permissions
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "xb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
@@ -0,0 +1,242 @@
+"""Zip cloned repositories into the shard archive while cloning continues."""
+import os
+import shutil
+import stat
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from scripts.tools import GIT_ENV, GitCommandError
+
+try:
+    from zlib_ng import zlib_ng
+except ImportError:  # pragma: no cover - optional accelerator
+    zlib_ng = None
+
+# Opt-in: ARCHIVE_ZLIB_NG=1 deflates and checksums the shard zip with zlib-ng
+# (see ShardArchive._open). Off by default because it swaps zipfile's
+# module-level zlib for every zipfile user in the process.
+ARCHIVE_ZLIB_NG = os.getenv("ARCHIVE_ZLIB_NG", "0") == "1"
+
+ZIP_EPOCH = 315532800  # 1980-01-01T00:00:00Z
+
+# Level 1 deflate keeps most of the size win on source files at a fraction of
+# the CPU of the default level 6
+ZIP_COMPRESSLEVEL = 1
+
+# Clones waiting for the writer; cloning pauses past this so a slow writer
+# cannot pile up .git directories on disk
+ARCHIVE_QUEUE_SIZE = int(os.getenv("ARCHIVE_QUEUE_SIZE", "4"))
+
+# The zip is built here and moved into the output directory when complete, so
+# a slow or network-mounted output dir sees one sequential copy at most and
+# never a half-written shard zip
+ARCHIVE_STAGING_DIR = os.getenv("ARCHIVE_STAGING_DIR") or tempfile.gettempdir()
+
+# Already compressed content is stored as is; deflating it again only burns CPU
+STORED_SUFFIXES = frozenset(
+    {
+        ".7z", ".bz2", ".gif", ".gz", ".jar", ".jpeg", ".jpg", ".mp3", ".mp4",
+        ".pdf", ".png", ".tgz", ".webp", ".whl", ".woff", ".woff2", ".xz",
+        ".zip", ".zst",
+    }
+)
+
+
+class ShardArchive:
+    """Shard zip that is filled by a single background writer thread.
+
+    The work items SDK only allows one reserved input at a time, so clones
+    have to run one after another on the main thread. Zipping does not, and
+    compressing repository N while repository N+1 is being cloned keeps the
+    CPU busy during network waits. ``zipfile`` is not thread-safe, so every
+    write happens on the one writer thread.
+    """
+
+    def __init__(self, output_path: Path, queue_size: int = ARCHIVE_QUEUE_SIZE):
+        self.output_path = Path(output_path)
+        self.repo_count = 0
+        self._names = set()
+        self._zip = None
+        self._staging_path = Path(ARCHIVE_STAGING_DIR) / (
+            f".{self.output_path.name}.{os.getpid()}.{id(self)}.tmp"
+        )
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._futures = []
+        self._slots = threading.BoundedSemaphore(max(queue_size, 1))
+        # arcname -> error for repositories the writer could not archive;
+        # read it after close()
+        self.failures = {}
+        self._zip_error = None
+
+    def __contains__(self, arcname: str) -> bool:
+        return arcname in self._names
+
+    def add(self, repo_path: Path, arcname: str, keep: bool = False) -> None:
+        """Queue a cloned repository to be written under ``arcname/``.
+
+        The clone is deleted once written, unless ``keep`` is set (for cached
+        clones); only ``.git`` is left on disk by then and none of it goes
+        into the zip. Blocks while the queue is full.
+        """
+        self._submit(arcname, self._stage_repo, repo_path, arcname, keep)
+
+    def add_tarball(self, tar_path: Path, arcname: str) -> None:
+        """Queue a downloaded GitHub tarball to be written under ``arcname/``.
+
+        The tarball's single top-level directory is replaced by ``arcname``
+        and the file is deleted once written. Blocks while the queue is full.
+        """
+        self._submit(arcname, self._stage_tarball, tar_path, arcname)
+
+    def _submit(self, arcname: str, stage, *args) -> None:
+        self._slots.acquire()
+        self.repo_count += 1
+        self._names.add(arcname)
+        future = self._executor.submit(self._write_entry, arcname, stage, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def close(self) -> None:
+        """Wait for queued repositories and finalize the zip.
+
+        A repository that fails to archive is left out of the zip and
+        recorded in ``failures``; the others are still published. An error
+        while writing the zip itself is re-raised, in which case no zip is
+        published. Nothing is created when no repository was written.
+        """
+        try:
+            try:
+                for future in self._futures:
+                    future.result()
+            finally:
+                self._executor.shutdown(wait=True)
+                if self._zip is not None:
+                    self._zip.close()
+            if self._zip is not None and len(self.failures) < self.repo_count:
+                self._publish()
+        finally:
+            self._staging_path.unlink(missing_ok=True)
+
+    def _publish(self) -> None:
+        try:
+            os.replace(self._staging_path, self.output_path)
+        except OSError:
+            # Staging dir on another filesystem: copy next to the target first
+            # so the final step is still an atomic rename
+            tmp_path = self.output_path.with_name(f".{self.output_path.name}.tmp")
+            shutil.copyfile(self._staging_path, tmp_path)
+            os.replace(tmp_path, self.output_path)
+
+    def _open(self) -> zipfile.ZipFile:
+        if self._zip is None:
+            if ARCHIVE_ZLIB_NG and zlib_ng is not None:
+                # zipfile looks up these module globals on every entry it writes,
+                # so this routes deflate and CRC-32 through zlib-ng's SIMD code
+                # paths. It is process-wide, not scoped to this archive: any
+                # other zipfile use after this point gets zlib-ng too (the
+                # Consumer writes no other zips). The output is ordinary
+                # deflate, readable by any unzip tool.
+                zipfile.zlib = zlib_ng
+                zipfile.crc32 = zlib_ng.crc32
+            # Remove existing zip file for idempotency
+            self.output_path.unlink(missing_ok=True)
+            self._zip = zipfile.ZipFile(
+                self._staging_path,
+                "x",
+                zipfile.ZIP_DEFLATED,
+                compresslevel=ZIP_COMPRESSLEVEL,
+            )
+        return self._zip
+
+    def _write_entry(self, arcname: str, stage, *args) -> None:
+        if self._zip_error is not None:
+            return  # close() re-raises it; nothing more can go into this zip
+        # zipfile cannot take entries back out, so each repository is staged
+        # as a complete tar first and copied into the zip only once that worked
+        with tempfile.TemporaryFile(dir=ARCHIVE_STAGING_DIR) as staged:
+            try:
+                stage(staged, *args)
+                staged.seek(0)
+                tar = tarfile.open(fileobj=staged, mode="r:")
+                members = tar.getmembers()
+            except Exception as e:
+                self.failures[arcname] = str(e) or type(e).__name__
+                self._names.discard(arcname)
+                return
+            try:
+                zf = self._open()
+                for member in members:
+                    self._write_member(zf, tar, member)
+            except BaseException as e:
+                self._zip_error = e
+                raise
+            finally:
+                tar.close()
+
+    def _stage_repo(self, staged, repo_path: Path, arcname: str, keep: bool) -> None:
+        # Clones are made without a checkout: git archive streams the HEAD tree
+        # straight from the object store, so no working tree is written or re-read.
+        # stderr goes to a file as well, so git can never block on a full pipe.
+        with tempfile.TemporaryFile(dir=ARCHIVE_STAGING_DIR) as stderr:
+            returncode = subprocess.run(
+                [
+                    "git", "-C", str(repo_path),
+                    "archive", "--format=tar", f"--prefix={arcname}/", "HEAD",
+                ],
+                stdin=subprocess.DEVNULL,
+                stdout=staged,
+                stderr=stderr,
+                env=GIT_ENV,
+            ).returncode
+            if returncode != 0:
+                stderr.seek(0)
+                raise GitCommandError(
+                    stderr.read().decode(errors="replace").strip()
+                    or f"git archive exited with status {returncode}"
+                )
+        # Free the disk space now rather than when the whole shard is done
+        if not keep:
+            shutil.rmtree(repo_path, ignore_errors=True)
+
+    def _stage_tarball(self, staged, tar_path: Path, arcname: str) -> None:
+        try:
+            with tarfile.open(tar_path, mode="r|gz") as src, tarfile.open(
+                fileobj=staged, mode="w"
+            ) as dst:
+                for member in src:
+                    _, sep, rest = member.name.partition("/")
+                    # GitHub names the top directory owner-repo-sha
+                    member.name = f"{arcname}/{rest}" if sep and rest else arcname
+                    dst.addfile(member, src.extractfile(member) if member.isfile() else None)
+        finally:
+            Path(tar_path).unlink(missing_ok=True)
+
+    @staticmethod
+    def _write_member(zf: zipfile.ZipFile, tar: tarfile.TarFile, member: tarfile.TarInfo) -> None:
+        name = f"{member.name}/" if member.isdir() else member.name
+        # Zip timestamps cannot predate 1980
+        zinfo = zipfile.ZipInfo(name, time.gmtime(max(member.mtime, ZIP_EPOCH))[:6])
+        if member.isdir():
+            zinfo.external_attr = (stat.S_IFDIR | member.mode) << 16 | 0x10
+            zf.writestr(zinfo, b"")
+        elif member.issym():
+            # Stored the way Info-ZIP stores links: the target path as content
+            zinfo.external_attr = (stat.S_IFLNK | 0o777) << 16
+            zf.writestr(zinfo, member.linkname)
+        elif member.isfile():
+            zinfo.external_attr = (stat.S_IFREG | member.mode) << 16
+            if Path(member.name).suffix.lower() in STORED_SUFFIXES:
+                zinfo.compress_type = zipfile.ZIP_STORED
+            else:
+                zinfo.compress_type = zf.compression
+                # ZipFile.open() does not apply the archive's level to a ZipInfo
+                zinfo._compresslevel = zf.compresslevel
+            zinfo.file_size = member.size
+            with tar.extractfile(member) as src, zf.open(zinfo, "w") as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
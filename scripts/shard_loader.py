@@ -1,10 +1,14 @@
 #!/usr/bin/env python3
 """Bash script replacement for loading shard work items."""
 import os
-import json
 import sys
 from pathlib import Path
 
+# Allow running as a plain script (python3 scripts/shard_loader.py)
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scripts.json_io import loads, write_bytes_atomic
+
 def load_shard():
     """Load work items from specific shard file."""
     shard_id = os.getenv("SHARD_ID", "0")
@@ -15,16 +19,16 @@ def load_shard():
         print(f"Shard file not found: {shard_file}")
         sys.exit(1)
     
-    with open(shard_file, 'r') as f:
-        shard_data = json.load(f)
+    # Parsed only to count and validate; the bytes are written out unchanged
+    shard_bytes = shard_file.read_bytes()
+    shard_data = loads(shard_bytes)
     
     # Create work items input file
     output_dir = Path("devdata/work-items-in/shard-input")
     output_dir.mkdir(parents=True, exist_ok=True)
     
     output_file = output_dir / "work-items.json"
-    with open(output_file, 'w') as f:
-        json.dump(shard_data, f)
+    write_bytes_atomic(output_file, shard_bytes)
     
     print(f"Loaded {len(shard_data)} items for shard {shard_id}")
 
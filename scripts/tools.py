@@ -1,13 +1,126 @@
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from robocorp import log
 from robocorp.tasks import get_output_dir, setup, teardown, session_cache
 import shutil
 import os
+import signal
+import subprocess
 import time
-from scripts.fetch_repos import fetch_github_repos
+import uuid
+from urllib.parse import urlsplit
+
+# Only the tip of the default branch is zipped, so history and tags are never needed.
+# The shard zip is streamed from git archive, so no working tree is checked out either.
+# Submodules are never zipped either, whatever the user's git config says.
+CLONE_OPTIONS = [
+    "--depth=1",
+    "--single-branch",
+    "--no-tags",
+    "--no-checkout",
+    "--no-recurse-submodules",
+    "--quiet",
+]
+
+# Seconds before a hung clone is abandoned and the item released for retry
+CLONE_TIMEOUT = int(os.getenv("CLONE_TIMEOUT", "300"))
+
+# Git never prompts for credentials: a private repository without a usable
+# token fails at once with an auth error instead of hanging until CLONE_TIMEOUT.
+# git archive runs smudge filters, so LFS is told to leave pointer files alone
+# rather than download every large object while the shard zip is written.
+# A transfer slower than 1 KB/s for 30 seconds is abandoned as stalled long
+# before CLONE_TIMEOUT would catch it.
+GIT_ENV = {
+    **os.environ,
+    "GIT_TERMINAL_PROMPT": "0",
+    "GIT_LFS_SKIP_SMUDGE": "1",
+    "GIT_HTTP_LOW_SPEED_LIMIT": "1000",
+    "GIT_HTTP_LOW_SPEED_TIME": "30",
+}
+
+# Protocol v2 lets the server filter the ref advertisement to HEAD, whatever
+# git version or config the runner has; cached clones never spend a fetch
+# on an automatic gc
+GIT_CONFIG = ["-c", "protocol.version=2", "-c", "gc.auto=0"]
+
+# "git" clones each repository; "tarball" downloads GitHub's archive of the
+# default branch instead, skipping the git protocol entirely (github.com only)
+ARCHIVE_MODE = os.getenv("ARCHIVE_MODE", "git")
+
+# Optional directory of shallow clones kept between runs. When set, a repository
+# seen before is refreshed with a depth-1 fetch instead of cloned from scratch.
+REPO_CACHE_DIR = os.getenv("REPO_CACHE_DIR")
+
+# Optional directory (for example a tmpfs such as /dev/shm) to clone into
+# instead of the output directory; only the shard zip is written to output
+CLONE_TMPDIR = os.getenv("CLONE_TMPDIR")
 
 # A shared context to pass data from fixtures to tasks
 task_context = {}
 
+# Producer outputs are saved in batches of this size. Saves within a batch run
+# on OUTPUT_SAVE_WORKERS threads. Keep it at 1 unless the adapter is known to
+# be safe to write from several threads (FileAdapter and SQLite are not, and
+# the custom Redis and DocDB adapters make no such promise); above 1 the items
+# of a batch are also enqueued in completion order rather than by stars.
+OUTPUT_BATCH_SIZE = int(os.getenv("OUTPUT_BATCH_SIZE", "100"))
+OUTPUT_SAVE_WORKERS = int(os.getenv("OUTPUT_SAVE_WORKERS", "1"))
+
+
+# Native rm, when present, unlinks a tree without per-entry Python overhead
+RM = shutil.which("rm")
+
+
+def remove_tree(path, workers=8):
+    """Like shutil.rmtree, but removes the top-level entries on a thread pool.
+
+    Unlinking is syscall-bound, so clearing several clones at once overlaps
+    the filesystem work instead of walking one tree after another. Each
+    directory is removed with ``rm -rf`` where available.
+    """
+    path = Path(path)
+    children = list(path.iterdir())
+
+    def remove(child):
+        if child.is_dir() and not child.is_symlink():
+            if RM:
+                result = subprocess.run(
+                    [RM, "-rf", "--", str(child)],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                )
+                if result.returncode != 0:
+                    raise OSError(result.stderr.strip() or f"rm -rf {child} failed")
+            else:
+                shutil.rmtree(child)
+        else:
+            child.unlink()
+
+    if children:
+        with ThreadPoolExecutor(max_workers=min(workers, len(children))) as executor:
+            # list() re-raises the first error, as shutil.rmtree would
+            list(executor.map(remove, children))
+    path.rmdir()
+
+
+def discard_tree(path, executor):
+    """Move a directory out of the way now and delete it on ``executor``.
+
+    The rename frees the name for a fresh clone immediately, while the
+    unlinking of a partial clone's objects happens off the task's path.
+    """
+    path = Path(path)
+    trash = path.with_name(f".trash-{path.name}-{uuid.uuid4().hex[:8]}")
+    try:
+        os.rename(path, trash)
+    except OSError:
+        trash = path
+    executor.submit(shutil.rmtree, trash, ignore_errors=True)
+
 
 @setup
 def manage_consumer_directory(task):
@@ -15,11 +128,12 @@ def manage_consumer_directory(task):
     if task.name == "consumer":
         output = get_output_dir() or Path("output")
         shard_id = os.getenv("SHARD_ID", "0")
-        repos_dir = output / f"repos-shard-{shard_id}"
+        clone_root = Path(CLONE_TMPDIR) if CLONE_TMPDIR and os.path.isdir(CLONE_TMPDIR) else output
+        repos_dir = clone_root / f"repos-shard-{shard_id}"
 
         # Clean up before task execution for a fresh start
         if repos_dir.exists():
-            shutil.rmtree(repos_dir)
+            remove_tree(repos_dir)
         repos_dir.mkdir(parents=True, exist_ok=True)
 
         task_context["repos_dir"] = repos_dir
@@ -31,7 +145,7 @@ def manage_consumer_directory(task):
             print(f"[Shard {shard_id}] Cleaning up cloned repositories directory...")
             if repos_dir.exists():
                 try:
-                    shutil.rmtree(repos_dir)
+                    remove_tree(repos_dir)
                     print(f"[Shard {shard_id}] Cleanup complete.")
                 except OSError as e:
                     print(f"Warning: Error removing directory {repos_dir}: {e}")
@@ -44,10 +158,11 @@ def manage_consumer_directory(task):
 @setup
 def measure_task_time(task):
     """Measure execution time for each task."""
-    start_time = time.time()
+    # Monotonic, so a clock adjustment mid-task cannot skew the duration
+    start_time = time.perf_counter()
     print(f"Starting task: {task.name}")
     yield  # Task executes here
-    duration = time.time() - start_time
+    duration = time.perf_counter() - start_time
     print(f"Task '{task.name}' completed in {duration:.2f} seconds")
 
 
@@ -73,9 +188,257 @@ def get_org_name():
     return None
 
 
+# DataFrames returned by repos(), by organization
+_repos_cache = {}
+
+
 def repos(org_name):
-    """Fetch the list of repositories from GitHub and return a DataFrame."""
+    """Fetch the list of repositories from GitHub and return a DataFrame.
+
+    Cached per organization, so input items repeating an org reuse the first
+    fetch. Only complete, non-empty listings are cached: a failed fetch
+    raises, and an empty result is fetched again next time. Callers must
+    not modify the returned DataFrame in place.
+    """
     if not org_name:
         raise ValueError("Organization name is required.")
+    cached = _repos_cache.get(org_name)
+    if cached is not None:
+        return cached
+    # Imported here so consumer and reporter runs never load pandas/requests
+    from scripts.fetch_repos import fetch_github_repos
+
     print(f"Fetching repositories for organization: {org_name}")
-    return fetch_github_repos(org_name)
\ No newline at end of file
+    df = fetch_github_repos(org_name)
+    if df is not None and not df.empty:
+        _repos_cache[org_name] = df
+    return df
+
+
+def save_outputs(outputs, workers=OUTPUT_SAVE_WORKERS):
+    """Save output work items created with ``save=False``; returns how many were saved.
+
+    Network-backed adapters spend each save waiting on a round trip, so with
+    more than one worker the saves of a batch overlap.
+    """
+
+    def save(output):
+        try:
+            output.save()
+            return True
+        except Exception as e:
+            log.critical(
+                f"Error creating work item for repository {output.payload.get('Name', 'unknown')}: {str(e)}"
+            )
+            return False
+
+    if workers <= 1 or len(outputs) <= 1:
+        return sum(map(save, outputs))
+    with ThreadPoolExecutor(max_workers=min(workers, len(outputs))) as executor:
+        return sum(executor.map(save, outputs))
+
+
+# Lowercase fragments of git/curl errors worth retrying on another run
+TRANSIENT_GIT_ERRORS = (
+    "could not resolve host",
+    "network",
+    "operation timed out",
+    "connection timed out",
+    "connection reset",
+    "tls handshake",
+    "early eof",
+    "the remote end hung up unexpectedly",
+    "operation too slow",
+)
+
+
+class GitCommandError(Exception):
+    """A git command, or the tarball download standing in for a clone, failed."""
+
+    @property
+    def transient(self):
+        """Whether the failure looks like a network hiccup rather than a bad repository."""
+        message = str(self).lower()
+        return any(needle in message for needle in TRANSIENT_GIT_ERRORS)
+
+
+def run_git(args, secret=None, timeout=None):
+    """Run the git CLI and return its stdout.
+
+    Raises GitCommandError with git's stderr as the message; ``secret`` (for
+    example a token embedded in a clone URL) is masked out of it. Running
+    past ``timeout`` seconds is reported as a (transient) timeout error.
+    """
+    # git runs in its own session, so on timeout its helpers (git-remote-https,
+    # index-pack) can be killed with it instead of writing on into a clone
+    # directory that is about to be removed
+    proc = subprocess.Popen(
+        ["git", *GIT_CONFIG, *args],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        env=GIT_ENV,
+        start_new_session=True,
+    )
+    try:
+        stdout, stderr = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        kill_process_group(proc)
+        proc.communicate()
+        raise GitCommandError(
+            f"git {args[0]}: operation timed out after {timeout} seconds"
+        ) from None
+    except BaseException:
+        # Interrupted: a new session no longer gets the terminal's SIGINT
+        kill_process_group(proc)
+        proc.wait()
+        raise
+    if proc.returncode != 0:
+        message = stderr.strip() or f"git {args[0]} exited with {proc.returncode}"
+        if secret:
+            message = message.replace(secret, "***")
+        raise GitCommandError(message)
+    return stdout
+
+
+def kill_process_group(proc):
+    """SIGKILL a process started with start_new_session=True and its children."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except ProcessLookupError:
+        pass
+
+
+def clone_repository(clone_url, repo_path, secret=None):
+    """Shallow-clone a repository with the git CLI and return its short commit hash."""
+    run_git(
+        ["clone", *CLONE_OPTIONS, clone_url, str(repo_path)],
+        secret=secret,
+        timeout=CLONE_TIMEOUT,
+    )
+    return run_git(["-C", str(repo_path), "rev-parse", "--short=8", "HEAD"]).strip()
+
+
+def cached_clone_path(url):
+    """Location of a repository's clone under REPO_CACHE_DIR, keyed by owner/name."""
+    repo_key = urlsplit(url).path.strip("/").removesuffix(".git")
+    return Path(REPO_CACHE_DIR).expanduser() / repo_key
+
+
+def update_cached_clone(url, clone_url, cache_path, secret=None):
+    """Bring the cached clone of url up to date and return its short commit hash.
+
+    An existing clone only fetches the new tip and then drops the previous
+    one; a missing or broken one is cloned afresh. The stored remote URL never contains the token.
+    """
+    cache_path = Path(cache_path)
+    if existing_clone_commit(cache_path):
+        run_git(
+            ["-C", str(cache_path), "fetch", "--depth=1", "--no-tags", "--quiet", clone_url, "HEAD"],
+            secret=secret,
+            timeout=CLONE_TIMEOUT,
+        )
+        run_git(["-C", str(cache_path), "update-ref", "HEAD", "FETCH_HEAD"])
+        # The clone's remote-tracking refs and the reflog still pin earlier
+        # tips, and GIT_CONFIG turns auto gc off, so drop them and reclaim the
+        # old objects and shallow entries here or the cache grows on every run
+        remote_refs = run_git(
+            ["-C", str(cache_path), "for-each-ref", "--format=%(refname)", "refs/remotes"]
+        ).split()
+        for ref in remote_refs:
+            run_git(["-C", str(cache_path), "update-ref", "--no-deref", "-d", ref])
+        run_git(
+            [
+                "-C", str(cache_path),
+                "-c", "gc.reflogExpire=now", "-c", "gc.reflogExpireUnreachable=now",
+                "gc", "--prune=now", "--quiet",
+            ],
+            timeout=CLONE_TIMEOUT,
+        )
+    else:
+        if cache_path.exists():
+            shutil.rmtree(cache_path)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        clone_repository(clone_url, cache_path, secret=secret)
+        run_git(["-C", str(cache_path), "remote", "set-url", "origin", url])
+    return run_git(["-C", str(cache_path), "rev-parse", "--short=8", "HEAD"]).strip()
+
+
+def existing_clone_commit(repo_path):
+    """Return the short HEAD hash of a usable clone at repo_path, or None."""
+    # Without its own .git, rev-parse would walk up into an enclosing repository
+    if not (Path(repo_path) / ".git").is_dir():
+        return None
+    try:
+        return run_git(
+            ["-C", str(repo_path), "rev-parse", "--verify", "--short=8", "HEAD"]
+        ).strip()
+    except GitCommandError:
+        return None
+
+
+@lru_cache(maxsize=1)
+def tarball_session():
+    """HTTP session shared by all tarball downloads of a run.
+
+    Work items arrive one at a time, so downloads cannot be fanned out; a
+    pooled session at least keeps the api.github.com and codeload
+    connections (and their TLS sessions) alive from one repository to the next.
+    """
+    # Imported here so plain git runs never load requests
+    import requests
+
+    return requests.Session()
+
+
+def download_tarball(url, dest, token=None):
+    """Download GitHub's tarball of a repository's default branch to dest.
+
+    Returns the short commit hash GitHub names the tarball after, or None.
+    Failures raise GitCommandError so they are handled like failed clones;
+    network errors and 5xx/429 responses are reported as transient.
+    """
+    import requests
+
+    parts = urlsplit(url)
+    if parts.hostname != "github.com":
+        raise GitCommandError(f"tarball download is only supported for github.com, not {parts.hostname}")
+    repo_key = parts.path.strip("/").removesuffix(".git")
+    headers = {"Accept": "application/vnd.github+json"}
+    if token:
+        headers["Authorization"] = f"token {token}"
+
+    dest = Path(dest)
+    try:
+        with tarball_session().get(
+            f"https://api.github.com/repos/{repo_key}/tarball",
+            headers=headers,
+            stream=True,
+            timeout=(10, CLONE_TIMEOUT),
+        ) as response:
+            if response.status_code >= 500 or response.status_code == 429:
+                raise GitCommandError(
+                    f"tarball download: network error (HTTP {response.status_code} {response.reason})"
+                )
+            if response.status_code != 200:
+                raise GitCommandError(
+                    f"tarball download: HTTP {response.status_code} {response.reason}"
+                )
+            with open(dest, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+            # attachment; filename=owner-repo-<sha>.tar.gz
+            disposition = response.headers.get("Content-Disposition", "")
+    except requests.RequestException as e:
+        dest.unlink(missing_ok=True)
+        raise GitCommandError(f"tarball download: network error: {e}") from None
+    except BaseException:
+        dest.unlink(missing_ok=True)
+        raise
+    _, _, filename = disposition.partition("filename=")
+    commit = filename.strip('"').removesuffix(".tar.gz").rpartition("-")[2]
+    return commit or None
@@ -1,17 +1,44 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from robocorp import log, workitems
 from robocorp.tasks import get_output_dir, task
-import shutil
 import os
-from git import Repo
-from git.exc import GitCommandError
-import json
 import time
 
 TimeoutException = Exception  # type: ignore
 
+# DataFrame columns copied into each producer output payload
+PAYLOAD_COLUMNS = (
+    "Name",
+    "URL",
+    "Description",
+    "Created",
+    "Last Updated",
+    "Language",
+    "Stars",
+    "Is Fork",
+    "Size",
+)
+
 # Import utility functions and fixtures from tools module
-from scripts.tools import task_context, get_org_name, repos
+from scripts.tools import (
+    task_context,
+    get_org_name,
+    repos,
+    save_outputs,
+    OUTPUT_BATCH_SIZE,
+    clone_repository,
+    discard_tree,
+    cached_clone_path,
+    update_cached_clone,
+    REPO_CACHE_DIR,
+    ARCHIVE_MODE,
+    download_tarball,
+    GitCommandError,
+)
+from scripts.shard_archive import ShardArchive
+from scripts.json_io import write_json
 
 
 @task
@@ -54,43 +81,45 @@ def producer():
 
             if df is not None and not df.empty:
                 log.info(f"Processing {len(df)} repositories from DataFrame")
-                rows = df.to_dict(orient="records")
                 created_count = 0
+                pending = []
 
+                # Plain tuples of just the payload columns, no per-row dict from to_dict()
+                rows = df.reindex(columns=PAYLOAD_COLUMNS).itertuples(
+                    index=False, name=None
+                )
                 for row in rows:
                     try:
-                        repo_payload = {
-                            "org": org_name,
-                            "Name": row.get("Name"),
-                            "URL": row.get("URL"),
-                            "Description": row.get("Description"),
-                            "Created": row.get("Created"),
-                            "Last Updated": row.get("Last Updated"),
-                            "Language": row.get("Language"),
-                            "Stars": row.get("Stars"),
-                            "Is Fork": row.get("Is Fork"),
-                        }
-
-                        # Validate required fields
-                        if not repo_payload.get("URL") or not repo_payload.get("Name"):
+                        # Validate required fields (Name and URL lead the tuple)
+                        # before any payload dict is built
+                        if not row[1] or not row[0]:
                             log.warn(
-                                f"Skipping repository with missing URL or Name: {repo_payload}"
+                                f"Skipping repository with missing URL or Name: {dict(zip(PAYLOAD_COLUMNS, row))}"
                             )
                             continue
 
-                        # Create work item
-                        workitems.outputs.create(repo_payload)
-                        created_count += 1
+                        repo_payload = {"org": org_name}
+                        repo_payload.update(zip(PAYLOAD_COLUMNS, row))
+
+                        # Create work item; saved with the rest of its batch
+                        pending.append(
+                            workitems.outputs.create(repo_payload, save=False)
+                        )
+                        if len(pending) >= OUTPUT_BATCH_SIZE:
+                            created_count += save_outputs(pending)
+                            pending = []
 
                     except Exception as e:
                         log.critical(
-                            f"Error creating work item for repository {row.get('Name', 'unknown')}: {str(e)}"
+                            f"Error creating work item for repository {row[0] or 'unknown'}: {str(e)}"
                         )
                         # Continue processing other repositories
                         continue
 
+                created_count += save_outputs(pending)
+
                 log.info(
-                    f"Created {created_count} work items out of {len(rows)} repositories"
+                    f"Created {created_count} work items out of {len(df)} repositories"
                 )
 
                 # Mark the input item as done only after all work items are created
@@ -125,7 +154,10 @@ def consumer():
     output_path = output / filename
 
     processed_repos = []
-    git_repos = []  # Track successfully cloned repo paths
+    # Cloned repos are zipped in the background while the next one clones
+    archive = ShardArchive(output_path)
+    # Failed partial clones are deleted in the background too
+    trash = ThreadPoolExecutor(max_workers=1)
 
     # Define report path before use
     report_path = output / f"report-shard-{shard_id}.json"
@@ -163,27 +195,20 @@ def consumer():
 
             if not repo_name:
                 # Fallback: extract repo name from URL
-                repo_name = url.split("/")[-1].replace(".git", "")
+                repo_name = url.rsplit("/", 1)[-1].removesuffix(".git")
 
             repo_path = repos_dir / repo_name
             log.info(f"[Shard {shard_id}] {org_name}/{repo_name} - cloning...")
 
-            # Check if repo already exists (idempotency check)
-            if repo_path.exists():
+            # Check if repo already exists (idempotency check): a repository
+            # named again later in the shard is already in the archive
+            if repo_name in archive:
                 log.info(
                     f"[Shard {shard_id}] {org_name}/{repo_name} - already exists, skipping"
                 )
-                processed_repos.append(
-                    {"name": repo_name, "url": url, "status": "already_exists"}
-                )
-                workitems.outputs.create(
-                    {
-                        "name": repo_name,
-                        "url": url,
-                        "org": org_name,
-                        "status": "already_exists",
-                    }
-                )
+                result = {"name": repo_name, "url": url, "status": "already_exists"}
+                processed_repos.append(result)
+                workitems.outputs.create({**result, "org": org_name})
                 item.done()
                 continue
 
@@ -201,39 +226,31 @@ def consumer():
                     except ValueError:
                         clone_url = url
 
-                # Clone with GitPython, with timeout and better error handling
-                repo = Repo.clone_from(
-                    clone_url, repo_path, depth=1
-                )  # Shallow clone for efficiency
+                # Clone with the git CLI directly; the token is masked in error messages
+                if ARCHIVE_MODE == "tarball":
+                    tar_path = repos_dir / f"{repo_name}.tar.gz"
+                    commit_hash = download_tarball(url, tar_path, token=token)
+                    archive.add_tarball(tar_path, repo_name)
+                elif REPO_CACHE_DIR:
+                    cache_path = cached_clone_path(url)
+                    commit_hash = update_cached_clone(
+                        url, clone_url, cache_path, secret=token
+                    )
+                    archive.add(cache_path, repo_name, keep=True)
+                else:
+                    commit_hash = clone_repository(clone_url, repo_path, secret=token)
+                    archive.add(repo_path, repo_name)
                 log.info(f"[Shard {shard_id}] {org_name}/{repo_name} - ✓")
-                processed_repos.append(
-                    {
-                        "name": repo_name,
-                        "url": url,
-                        "status": "success",
-                        "commit_hash": (
-                            repo.head.commit.hexsha[:8]
-                            if repo.head.commit
-                            else "unknown"
-                        ),
-                    }
-                )
-                git_repos.append(repo_path)  # Add to cleanup list
+                result = {
+                    "name": repo_name,
+                    "url": url,
+                    "status": "success",
+                    "commit_hash": commit_hash or "unknown",
+                }
+                processed_repos.append(result)
 
                 # Create output work item for success
-                workitems.outputs.create(
-                    {
-                        "name": repo_name,
-                        "url": url,
-                        "org": org_name,
-                        "status": "success",
-                        "commit_hash": (
-                            repo.head.commit.hexsha[:8]
-                            if repo.head.commit
-                            else "unknown"
-                        ),
-                    }
-                )
+                workitems.outputs.create({**result, "org": org_name})
                 item.done()
 
             except GitCommandError as git_err:
@@ -244,56 +261,25 @@ def consumer():
 
                 # Clean up partial clone on failure
                 if repo_path.exists():
-                    try:
-                        shutil.rmtree(repo_path)
-                    except OSError:
-                        pass
-
-                if (
-                    "could not resolve host" in str(git_err).lower()
-                    or "network" in str(git_err).lower()
-                ):
+                    discard_tree(repo_path, trash)
+
+                status = "released" if git_err.transient else "failed"
+                result = {
+                    "name": repo_name,
+                    "url": url,
+                    "status": status,
+                    "error": error_msg,
+                }
+                processed_repos.append(result)
+                # Create output work item for the released or failed clone
+                workitems.outputs.create({**result, "org": org_name})
+
+                if git_err.transient:
                     log.warn(
                         f"[Shard {shard_id}] {org_name}/{repo_name} - network error, releasing for retry"
                     )
-                    processed_repos.append(
-                        {
-                            "name": repo_name,
-                            "url": url,
-                            "status": "released",
-                            "error": error_msg,
-                        }
-                    )
-                    # Create output work item for released
-                    workitems.outputs.create(
-                        {
-                            "name": repo_name,
-                            "url": url,
-                            "org": org_name,
-                            "status": "released",
-                            "error": error_msg,
-                        }
-                    )
                     # Do not mark as done or failed, so it can be retried if supported
                 else:
-                    processed_repos.append(
-                        {
-                            "name": repo_name,
-                            "url": url,
-                            "status": "failed",
-                            "error": error_msg,
-                        }
-                    )
-                    # Create output work item for failure
-                    workitems.outputs.create(
-                        {
-                            "name": repo_name,
-                            "url": url,
-                            "org": org_name,
-                            "status": "failed",
-                            "error": error_msg,
-                        }
-                    )
                     item.fail("BUSINESS", code="GIT_ERROR", message=error_msg)
                 continue
 
@@ -303,52 +289,61 @@ def consumer():
             item.fail("APPLICATION", code="UNEXPECTED_ERROR", message=error_msg)
             continue
 
+    trash.shutdown(wait=True)
+
+    # Only create zip if we have successfully cloned repos. The zip is closed
+    # before the report is written, so the report records the repositories
+    # that made it into the zip rather than just the clones.
+    archive_failures = {}
+    if archive.repo_count:
+        try:
+            log.info(
+                f"[Shard {shard_id}] Zipping {archive.repo_count} cloned repositories..."
+            )
+            archive.close()
+            archive_failures = archive.failures
+            if len(archive_failures) < archive.repo_count:
+                log.info(f"[Shard {shard_id}] Zipped repositories to: {output_path}")
+        except Exception as e:
+            log.critical(f"Error creating zip archive: {e}")
+            archive_failures = {
+                r["name"]: str(e) for r in processed_repos if r["status"] == "success"
+            }
+    else:
+        log.info(f"[Shard {shard_id}] No repositories to zip")
+
+    # Their work items were already released as done, so the shard report is
+    # where a repository missing from the zip is recorded
+    for result in processed_repos:
+        if result["status"] == "success" and result["name"] in archive_failures:
+            error_msg = (
+                f"Archiving {result['name']} from org {org_name} failed: "
+                f"{archive_failures[result['name']]}"
+            )
+            log.critical(f"[Shard {shard_id}] {org_name}/{result['name']} - ✗ {error_msg}")
+            result["status"] = "failed"
+            result["error"] = error_msg
+
     # Create a summary report (idempotent - overwrites existing)
+    status_counts = Counter(r["status"] for r in processed_repos)
     report = {
         "shard_id": shard_id,
         "org_name": org_name,
         "total_processed": len(processed_repos),
-        "successful_clones": len(
-            [r for r in processed_repos if r["status"] == "success"]
-        ),
-        "failed_clones": len([r for r in processed_repos if r["status"] == "failed"]),
-        "released_items": len(
-            [r for r in processed_repos if r["status"] == "released"]
-        ),
-        "already_existing": len(
-            [r for r in processed_repos if r["status"] == "already_exists"]
-        ),
+        "successful_clones": status_counts["success"],
+        "failed_clones": status_counts["failed"],
+        "released_items": status_counts["released"],
+        "already_existing": status_counts["already_exists"],
         "repositories": processed_repos,
         "timestamp": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime()),
     }
 
     try:
-        with open(report_path, "w") as f:
-            json.dump(report, f, indent=4)
+        write_json(report_path, report, indent=True)
         log.info(f"[Shard {shard_id}] Consumer task finished. Report at: {report_path}")
     except Exception as e:
         log.warn(f"Warning: Could not write report to {report_path}: {e}")
 
-    # Only create zip if we have successfully cloned repos
-    if git_repos:
-        try:
-            # Remove existing zip file for idempotency
-            if output_path.exists():
-                output_path.unlink()
-
-            # Zip the cloned repositories directory
-            log.info(
-                f"[Shard {shard_id}] Zipping {len(git_repos)} cloned repositories..."
-            )
-            shutil.make_archive(
-                str(output_path.with_suffix("")), "zip", root_dir=repos_dir
-            )
-            log.info(f"[Shard {shard_id}] Zipped repositories to: {output_path}")
-        except Exception as e:
-            log.critical(f"Error creating zip archive: {e}")
-    else:
-        log.info(f"[Shard {shard_id}] No repositories to zip")
-
     # Cleanup is now handled by the manage_consumer_directory fixture.
 
 
@@ -363,6 +358,7 @@ def reporter():
         "organizations": set(),
         "repositories": [],
     }
+    status_counts = Counter()
 
     for item in workitems.inputs:
         try:
@@ -397,16 +393,10 @@ def reporter():
             status = payload.get("status", "unknown")
             repo_name = payload.get("name") or payload.get("Name", "unknown")
 
-            summary_stats["total_items_processed"] += 1
             summary_stats["organizations"].add(org_name)
 
-            # Count by status
-            if status == "success":
-                summary_stats["successful_items"] += 1
-            elif status == "failed":
-                summary_stats["failed_items"] += 1
-            elif status == "released":
-                summary_stats["released_items"] += 1
+            # Count by status; the summary totals are filled in after the loop
+            status_counts[status] += 1
 
             # Add repository details
             summary_stats["repositories"].append(
@@ -427,6 +417,10 @@ def reporter():
             item.fail("APPLICATION", code="UNEXPECTED_ERROR", message=error_msg)
 
     # Generate final summary
+    summary_stats["total_items_processed"] = status_counts.total()
+    summary_stats["successful_items"] = status_counts["success"]
+    summary_stats["failed_items"] = status_counts["failed"]
+    summary_stats["released_items"] = status_counts["released"]
     summary_stats["organizations"] = list(summary_stats["organizations"])
     success_rate = (
         (
@@ -449,24 +443,24 @@ def reporter():
     log.info(f"📊 Success rate: {success_rate:.1f}%")
     log.info("=" * 50)
 
-    # Save detailed report
+    # Save detailed report; one clock reading so the file name and the
+    # timestamp inside it always agree
     output_dir = get_output_dir() or Path("output")
+    report_time = time.gmtime()
     report_file = (
-        output_dir
-        / f"final_report_{time.strftime('%Y%m%d-%H%M%S', time.gmtime())}.json"
+        output_dir / f"final_report_{time.strftime('%Y%m%d-%H%M%S', report_time)}.json"
     )
 
     try:
-        with open(report_file, "w") as f:
-            json.dump(
-                {
-                    "timestamp": time.strftime("%Y-%m-%d %H:%M:%S UTC", time.gmtime()),
-                    "summary": summary_stats,
-                    "success_rate_percent": success_rate,
-                },
-                f,
-                indent=4,
-            )
+        write_json(
+            report_file,
+            {
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S UTC", report_time),
+                "summary": summary_stats,
+                "success_rate_percent": success_rate,
+            },
+            indent=True,
+        )
         log.info(f"📄 Detailed report saved to: {report_file}")
     except Exception as e:
         log.warn(f"Warning: Could not save detailed report: {e}")